@@ -50,7 +50,7 @@ from saccharis import FastTree_Build
 from saccharis import Muscle_Alignment
 from saccharis import RAxML_Build
 from saccharis.Rendering import render_phylogeny
-from saccharis.utils.AdvancedConfig import get_user_settings, get_log_folder, get_version
+from saccharis.utils.AdvancedConfig import get_user_settings, get_log_folder, get_version, validate_raxml_availability
 from saccharis.utils.AdvancedConfig import save_to_file
 from saccharis.utils.FamilyCategories import check_deleted_families
 from saccharis.utils.Formatting import make_metadata_dict, format_time, CazymeMetadataRecord
@@ -208,6 +208,8 @@ def single_pipeline(family: str, output_folder: str | os.PathLike,
         settings = get_user_settings()
     ncbi_query_size = settings["genbank_query_size"]
     raxml_cmd = settings["raxml_command"]
+    if tree_program == ChooseAAModel.TreeBuilder.RAXML:
+        validate_raxml_availability(settings)
 
     start_t = time.time()
     print("==============================================================================")
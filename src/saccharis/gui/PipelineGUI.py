@@ -4,6 +4,7 @@
 # Original author: Alexander Fraser, https://github.com/AlexSCFraser
 # License: GPL v3
 ###############################################################################
+import atexit
 import io
 import math
 import os
@@ -11,6 +12,8 @@ import re
 import subprocess
 import sys
 import logging
+import threading
+from concurrent.futures import Future
 from types import SimpleNamespace
 from io import TextIOWrapper
 from typing import IO
@@ -72,6 +75,15 @@ from saccharis.utils.Formatting import rename_header_ids
 
 logger = make_logger("GUILogger", get_log_folder(), "gui_logs.txt")
 
+# Maximum number of lines (text blocks) kept in the console output pane. Older lines are discarded by Qt once this is
+# exceeded, so memory use and insertion cost stay bounded during long pipeline runs.
+CONSOLE_MAX_BLOCK_COUNT = 5000
+
+# Single null device descriptor shared by every TextSignalRedirector, so the number of open file descriptors doesn't grow
+# with the number of redirectors created over a session. It is closed when the interpreter exits.
+_NULL_FD = os.open(os.devnull, os.O_RDWR)
+atexit.register(os.close, _NULL_FD)
+
 sys._excepthook = sys.excepthook  # save original excepthook
 
 
@@ -149,6 +161,7 @@ class SACCHARISApp(QMainWindow, UIDesign.Ui_MainWindow):
         self.run_button.setCheckable(True)
 
         # connect text redirection streams
+        self.console_output_textBrowser.document().setMaximumBlockCount(CONSOLE_MAX_BLOCK_COUNT)
         self.send_text.connect(self.update_text_browser)
         self.console_redirect = TextSignalRedirector(self.send_text)
         sys.stdout = self.console_redirect
@@ -811,6 +824,9 @@ class ScreenDlg(QDialog):
         self.filter_obj = FilterFamily()
         self.ui = ScreenDialog.Ui_Dialog()
         self.ui.setupUi(self)
+        # setupUi builds a separate 10pt font for each of these, so the checkbox reuses the button's font instead.
+        # ScreenDialog.py is generated by pyuic5 from screen_dialog.ui, so this is done here rather than edited there.
+        self.ui.include_subfamily_checkbox.setFont(self.ui.save_intersection_button.font())
         self.setWindowTitle("Export/Run CAZome")
         for path in fasta_count_dict.keys():
             self.ui.file_list_listWidget.addItem(path)  # .append(f"\"{os.path.basename(path)}\"
@@ -1248,12 +1264,14 @@ class PipelineWorker(QObject):
 
 
 class TextSignalRedirector(io.StringIO):
+    # write() is called for every print in the pipeline, so attributes are slotted for cheaper lookups
+    __slots__ = ("update_ui", "file_descriptor")
+
     def __init__(self, update_ui: pyqtSignal, subprocess_file_descriptor=None):
         # super().__init__(buffer)
         super().__init__()
         self.update_ui = update_ui
         self.file_descriptor = subprocess_file_descriptor
-        self.null_file_descriptor = os.open(os.devnull, os.O_RDWR)
 
     def write(self, string):
         # noinspection PyUnresolvedReferences
@@ -1267,20 +1285,18 @@ class TextSignalRedirector(io.StringIO):
         # self.console_window.ensureCursorVisible()
         # self.console_window.insertPlainText(text)
 
-    def close(self) -> None:
-        os.close(self.null_file_descriptor)
-        super().close()
-
     def fileno(self):
         # return a file descriptor passed in when this object was created for subprocesses to write to when the
         #  stream cannot be redirected to gui textbox
         if self.file_descriptor:
             return self.file_descriptor
         else:
-            return self.null_file_descriptor
+            return _NULL_FD
 
 
 class TextSignalWrapper(io.TextIOWrapper):
+    __slots__ = ("update_ui",)
+
     def __init__(self, buffer, update_ui: pyqtSignal):
         # super().__init__(buffer)
         super().__init__(buffer)
@@ -1303,37 +1319,118 @@ class TextSignalWrapper(io.TextIOWrapper):
         super().close()
 
 
-def tell_user(string, detail_string=None):
+# Message boxes shown by tell_user are parentless and non-modal, so we hold a reference to each one until it closes to
+# stop python from garbage collecting (and thereby closing) it as soon as tell_user returns.
+_open_message_boxes = set()
+
+
+def _show_info(future: Future, string, detail_string):
+    # open() shows the message box without starting a nested event loop, the future resolves once the box is closed
     msg_box = QMessageBox()
     msg_box.setText(string)
     msg_box.setWindowTitle("Information")
     if detail_string:
         msg_box.setDetailedText(detail_string)
-    msg_box.exec()
+    msg_box.setAttribute(Qt.Qt.WA_DeleteOnClose)
+    _open_message_boxes.add(msg_box)
 
+    def box_finished(result):
+        _open_message_boxes.discard(msg_box)
+        future.set_result(result)
 
-def get_user_str(title_msg, item_msg, gui_parent):
+    # noinspection PyUnresolvedReferences
+    msg_box.finished.connect(box_finished)
+    msg_box.open()
+
+
+def _ask_text(future: Future, title_msg, item_msg, gui_parent):
     text, ok = QInputDialog().getText(gui_parent, title_msg,
                                       item_msg, QLineEdit.Normal)
     if ok and text:
-        return text
+        future.set_result(text)
     else:
-        return None
+        future.set_result(None)
 
 
-def ask_user_yes_no(question_string, yes_msg, no_msg, gui_parent):
-    # msg_box = QMessageBox()
+def _ask_yes_no(future: Future, question_string, yes_msg, no_msg, gui_parent):
     button_reply = QMessageBox.question(gui_parent, "Answer required", question_string, QMessageBox.Yes, QMessageBox.No)
-    # button_reply = QMessageBox.question("Test", question_string, QMessageBox.Yes, QMessageBox.No)
 
     if button_reply == QMessageBox.Yes:
         if yes_msg:
             QMessageBox.information(gui_parent, "Accepted", yes_msg)
-        return True
+        future.set_result(True)
     else:
         if no_msg:
             QMessageBox.information(gui_parent, "Cancelled", no_msg)
-        return False
+        future.set_result(False)
+
+
+_prompt_kinds = {"info": _show_info, "text": _ask_text, "yes_no": _ask_yes_no}
+
+
+def _run_prompt(future: Future, kind: str, args: tuple):
+    try:
+        _prompt_kinds[kind](future, *args)
+    except Exception as error:
+        future.set_exception(error)
+
+
+class PromptProxy(QObject):
+    """Lives in the GUI thread and shows prompts requested from other threads."""
+    prompt_requested = pyqtSignal(object, str, object)
+
+    def __init__(self):
+        super().__init__()
+        # noinspection PyUnresolvedReferences
+        self.prompt_requested.connect(self.run_prompt)
+
+    @pyqtSlot(object, str, object)
+    def run_prompt(self, future, kind, args):
+        _run_prompt(future, kind, args)
+
+
+_prompt_proxy = None
+# worker threads can prompt at the same time, so the proxy is created under a lock to make sure only one ever exists
+_prompt_proxy_lock = threading.Lock()
+
+
+def prompt_async(kind: str, *args) -> Future:
+    """
+    Show a user prompt on the GUI thread, from any thread. Returns a future which resolves to the prompt result.
+
+    Dialogs can only be created on the GUI thread, so requests made from other threads are queued onto it through a
+    PromptProxy, and the calling thread can wait on the future while the GUI thread keeps processing signals such as
+    console output. Requests made on the GUI thread are shown immediately.
+    """
+    global _prompt_proxy
+    future = Future()
+    gui_thread = QApplication.instance().thread()
+    if QThread.currentThread() == gui_thread:
+        _run_prompt(future, kind, args)
+    else:
+        with _prompt_proxy_lock:
+            if _prompt_proxy is None:
+                _prompt_proxy = PromptProxy()
+                _prompt_proxy.moveToThread(gui_thread)
+        # noinspection PyUnresolvedReferences
+        _prompt_proxy.prompt_requested.emit(future, kind, args)
+    return future
+
+
+def tell_user(string, detail_string=None, callback=None):
+    # Doesn't wait for the message box to be closed. Anything which must wait for the user should pass a callback, which
+    # is called with the box result.
+    future = prompt_async("info", string, detail_string)
+    if callback:
+        future.add_done_callback(lambda done: callback(done.result()))
+
+
+def get_user_str(title_msg, item_msg, gui_parent):
+    return prompt_async("text", title_msg, item_msg, gui_parent).result()
+
+
+def ask_user_yes_no(question_string, yes_msg, no_msg, gui_parent):
+    return prompt_async("yes_no", question_string, yes_msg, no_msg, gui_parent).result()
 
 
 def main():
@@ -6,22 +6,25 @@
 ###############################################################################
 # Built in libraries
 import argparse
+import functools
 import importlib.metadata
-import inspect
 import json
 import os
-import pathlib
 import shutil
-import time
 from importlib.metadata import version
 from json import JSONDecodeError
 from logging import Logger, getLogger
 from subprocess import run, CalledProcessError
-from dotenv import load_dotenv
+from dotenv import dotenv_values
 import textwrap as _textwrap
 # Internal imports
 from saccharis.utils.UserInput import ask_yes_no
 
+# Base saccharis install directory, the package config file is stored in the data folder under it.
+_base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# User home folder, expanding '~' can require a lookup in the password database so it is only done once.
+_home = os.path.expanduser('~')
+
 
 def get_version():
     try:
@@ -31,112 +34,180 @@ def get_version():
 
 
 def get_default_package_settings(logger: Logger = getLogger()):
-    default_package_settings = {"user_data_folder": os.path.expanduser('~')}
+    default_package_settings = {"user_data_folder": _home}
     msg = f"Default package settings: {default_package_settings}"
     logger.info(msg)
     return default_package_settings
 
 
 def load_from_file(path: str | os.PathLike):
-    with open(path, 'r', encoding="utf-8") as sfile:
-        settings = json.loads(sfile.read())
+    # json accepts utf-8 bytes directly, which skips decoding through a text mode file wrapper
+    with open(path, 'rb') as sfile:
+        settings = json.load(sfile)
     return settings
 
 
+# In-memory copies of the settings files, so they are only read from disk once per process. save_package_settings() and
+# save_to_file() reset these, so the next call reads the newly saved file.
+_package_settings_cache = None
+_user_settings_cache = None
+# st_mtime_ns of the user settings file when it was cached, so edits made outside this process are also picked up
+_user_settings_mtime = None
+
+
 def get_package_settings(logger: Logger = getLogger()):
-    base_dir = pathlib.PurePath(inspect.getsourcefile(lambda: 0)).parents[1]
-    msg = f"Base saccharis install directory: {base_dir}"
+    global _package_settings_cache
+    if _package_settings_cache is None:
+        _package_settings_cache = _read_package_settings(logger)
+    # return a copy, callers are free to modify the returned settings before saving them
+    return dict(_package_settings_cache)
+
+
+def _read_package_settings(logger: Logger):
+    msg = f"Base saccharis install directory: {_base_dir}"
     logger.debug(msg)
-    data_folder = base_dir / "data"
-    config_path = data_folder / "config.json"
-    if not os.path.isfile(config_path):
+    config_path = os.path.join(_base_dir, "data", "config.json")
+    try:
+        msg = f"Attempting to load package settings from {config_path}"
+        logger.debug(msg)
+        current_package_settings = load_from_file(config_path)
+        logger.debug(f"Package settings: {current_package_settings}")
+        return current_package_settings
+    except FileNotFoundError:
         msg = f"No file found at {config_path}, loading default package settings."
         logger.info(msg)
         return get_default_package_settings(logger)
-    else:
-        try:
-            msg = f"Attempting to load package settings from {config_path}"
-            logger.debug(msg)
-            current_package_settings = load_from_file(config_path)
-            logger.debug(f"Package settings: {current_package_settings}")
-            return current_package_settings
-        except JSONDecodeError:
-            msg = f"JSON decode error encountered trying to load package settings from {config_path}, using defaults " \
-                  f"instead."
-            logger.exception(msg)
-            return get_default_package_settings(logger)
+    except JSONDecodeError:
+        msg = f"JSON decode error encountered trying to load package settings from {config_path}, using defaults " \
+              f"instead."
+        logger.exception(msg)
+        return get_default_package_settings(logger)
 
 
 def save_package_settings(new_package_settings):
-    base_dir = pathlib.PurePath(inspect.getsourcefile(lambda: 0)).parents[1]
-    data_folder = base_dir / "data"
-    config_path = data_folder / "config.json"
-    if os.path.isfile(config_path):
-        try:
-            old_package_settings = load_from_file(config_path)
-        except JSONDecodeError:
-            old_package_settings = {}
-    else:
-        old_package_settings = {}
-
-    for key in old_package_settings:
-        if key not in new_package_settings:
-            new_package_settings[key] = old_package_settings[key]
+    config_path = os.path.join(_base_dir, "data", "config.json")
+    # keys missing from the new settings keep their current values, which are already cached in memory
+    new_package_settings = {**get_package_settings(), **new_package_settings}
     save_to_file(new_package_settings, config_path)
+    global _package_settings_cache, _paths
+    _package_settings_cache = None
+    # the folder paths are derived from the package settings, so they are worked out again on next use
+    _paths = None
 
 
 # IMPROVEMENT TODO: Consider refactoring to a global settings object with all the settings and get/set methods.
-package_settings = get_package_settings()
-user_dir = package_settings["user_data_folder"] if "user_data_folder" in package_settings else os.path.expanduser('~')
-folder_saccharis_user = os.path.join(user_dir, "saccharis")
-default_folder_config = os.path.join(folder_saccharis_user, "config")
-default_settings_path = os.path.join(default_folder_config, "advanced_settings.json")
-default_db_dir = os.path.join(folder_saccharis_user, "db")
-folder_db = package_settings["database_folder"] if "database_folder" in package_settings else default_db_dir
-folder_logs = os.path.join(folder_saccharis_user, "logs")
-folder_default_output = os.path.join(folder_saccharis_user, "output")
-folder_ncbi = os.path.join(folder_saccharis_user, "ncbi_downloads")
+# The folder paths below depend on the package settings file, so they are computed on first use instead of at import.
+# This keeps importing this module free of file I/O. The paths are available through the get_*_folder() functions below,
+# or as module attributes (e.g. AdvancedConfig.folder_db) for backwards compatibility.
+_path_names = ("package_settings", "user_dir", "folder_saccharis_user", "default_folder_config",
+               "default_settings_path", "default_db_dir", "folder_db", "folder_logs", "folder_default_output",
+               "folder_ncbi")
+_paths = None
+
+
+def _get_paths():
+    global _paths
+    if _paths is None:
+        package_settings = get_package_settings()
+        user_dir = package_settings["user_data_folder"] if "user_data_folder" in package_settings else _home
+        folder_saccharis_user = os.path.join(user_dir, "saccharis")
+        default_folder_config = os.path.join(folder_saccharis_user, "config")
+        default_db_dir = os.path.join(folder_saccharis_user, "db")
+        _paths = {"package_settings": package_settings,
+                  "user_dir": user_dir,
+                  "folder_saccharis_user": folder_saccharis_user,
+                  "default_folder_config": default_folder_config,
+                  "default_settings_path": os.path.join(default_folder_config, "advanced_settings.json"),
+                  "default_db_dir": default_db_dir,
+                  "folder_db": package_settings["database_folder"] if "database_folder" in package_settings
+                  else default_db_dir,
+                  "folder_logs": os.path.join(folder_saccharis_user, "logs"),
+                  "folder_default_output": os.path.join(folder_saccharis_user, "output"),
+                  "folder_ncbi": os.path.join(folder_saccharis_user, "ncbi_downloads")}
+    return _paths
+
+
+def __getattr__(name):
+    # only called for names not found in the module globals, see PEP 562. The value isn't stored in the globals, so
+    # that the paths still change when save_package_settings() changes the settings they are derived from.
+    if name in _path_names:
+        return _get_paths()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_db_folder(logger: Logger = getLogger()):
+    folder_db = _get_paths()["folder_db"]
     msg = f"Current database_folder: {folder_db}"
     logger.debug(msg)
     return folder_db
 
 
 def get_log_folder():
-    return folder_logs
+    return _get_paths()["folder_logs"]
 
 
 def get_output_folder():
-    return folder_default_output
+    return _get_paths()["folder_default_output"]
 
 
 def get_config_folder():
-    return default_folder_config
+    return _get_paths()["default_folder_config"]
 
 
 def get_ncbi_folder():
-    return folder_ncbi
+    return _get_paths()["folder_ncbi"]
+
+
+def get_settings_path():
+    return _get_paths()["default_settings_path"]
 
 
 class MultilineFormatter(argparse.HelpFormatter):
     def _fill_text(self, text, width, indent):
         text = self._whitespace_matcher.sub(' ', text).strip()
         paragraphs = text.split('|n ')
-        multiline_text = ''
-        for paragraph in paragraphs:
-            formatted_paragraph = _textwrap.fill(paragraph, width, initial_indent=indent, subsequent_indent=indent) + \
-                                  '\n'
-            multiline_text = multiline_text + formatted_paragraph
-        return multiline_text
+        wrapper = _textwrap.TextWrapper(width, initial_indent=indent, subsequent_indent=indent)
+        return ''.join(wrapper.fill(paragraph) + '\n' for paragraph in paragraphs)
+
+
+# Parsed contents of the .env file in the config folder. The file is only parsed again if its path or st_mtime_ns
+# changes, or after reload_env() is called.
+_env_cache = None
+_env_cache_key = None
+
+
+def _env_file_key(env_path):
+    try:
+        return env_path, os.stat(env_path).st_mtime_ns
+    except FileNotFoundError:
+        return env_path, None
+
+
+def _load_env_dict(env_path):
+    global _env_cache, _env_cache_key
+    cache_key = _env_file_key(env_path)
+    if _env_cache is None or cache_key != _env_cache_key:
+        _env_cache = dotenv_values(env_path) if cache_key[1] is not None else {}
+        _env_cache_key = cache_key
+    return _env_cache
+
+
+def reload_env():
+    """Make the next load_from_env() call parse the .env file again."""
+    global _env_cache
+    _env_cache = None
 
 
 def load_from_env(gui_object=None, ask_method=None, get_method=None, show_user_method=print, skip_ask=False):
-    if not os.path.isdir(default_folder_config):
-        os.mkdir(default_folder_config)
-    load_dotenv(os.path.join(default_folder_config, ".env"), override=True)
-    if "API_KEY" in os.environ:
+    global _env_cache_key
+    default_folder_config = get_config_folder()
+    os.makedirs(default_folder_config, exist_ok=True)
+    env_path = os.path.join(default_folder_config, ".env")
+    # values in the .env file take priority over environment variables
+    env = _load_env_dict(env_path)
+    if "API_KEY" in env:
+        api_key = env["API_KEY"]
+    elif "API_KEY" in os.environ:
         api_key = os.environ['API_KEY']
     elif not skip_ask:
         show_user_method("WARNING: NCBI API KEY NOT FOUND! This will reduce speed of NCBI querying.\n"
@@ -155,11 +226,15 @@ def load_from_env(gui_object=None, ask_method=None, get_method=None, show_user_m
                 api_key = input("Please enter your NCBI API key with no spaces: ")
             if api_key:  # check that user entered an api_key. the gui get_method returns a None type on cancel click
                 api_key = api_key.strip()
-                with open(os.path.join(default_folder_config, ".env"), 'a') as f:
+                with open(env_path, 'a') as f:
                     f.write(f"API_KEY={api_key}\n")
+                    # make sure the key is on disk before anything else reads or appends to the file
+                    f.flush()
+                    os.fsync(f.fileno())
+                # keep the cached .env contents in step with the file, so it doesn't need to be parsed again
+                env["API_KEY"] = api_key
+                _env_cache_key = _env_file_key(env_path)
                 show_user_method("Note: API key has been stored in the .env file in the SACCHARIS config directory.")
-                time.sleep(0.5)  # sleep the thread briefly because for some reason the email won't be written properly
-                # sometimes and I think it's some kind of problem with the file not being fully closed in the OS yet.
         else:
             api_key = None
     else:
@@ -167,7 +242,9 @@ def load_from_env(gui_object=None, ask_method=None, get_method=None, show_user_m
 
     ncbi_tool = "saccharis2"
 
-    if "EMAIL" in os.environ:
+    if "EMAIL" in env:
+        ncbi_email = env["EMAIL"]
+    elif "EMAIL" in os.environ:
         ncbi_email = os.environ['EMAIL']
     else:
         ncbi_email = "alexscf@msl.ubc.ca"
@@ -200,45 +277,88 @@ def load_from_env(gui_object=None, ask_method=None, get_method=None, show_user_m
     return api_key, ncbi_email, ncbi_tool
 
 
+def _settings_file_mtime():
+    try:
+        return os.stat(get_settings_path()).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
 def get_user_settings():
-    if not os.path.isfile(default_settings_path):
-        save_to_file(get_default_settings())
+    global _user_settings_cache, _user_settings_mtime
+    if _user_settings_cache is None or _settings_file_mtime() != _user_settings_mtime:
+        _user_settings_cache = _read_user_settings()
+        _user_settings_mtime = _settings_file_mtime()
+    # return a copy, callers are free to modify the returned settings before saving them
+    return dict(_user_settings_cache)
 
+
+def _read_user_settings():
     try:
-        user_settings = load_from_file(default_settings_path)
+        user_settings = load_from_file(get_settings_path())
+    except FileNotFoundError:
+        user_settings = get_default_settings()
+        save_to_file(user_settings)
     except JSONDecodeError:
         user_settings = {}
-    settings = get_default_settings()
-    for item in settings.keys():
-        if item in user_settings:
-            settings[item] = user_settings[item]
+    default_settings = get_default_settings()
+    # unknown keys in the user file are ignored, missing keys fall back to defaults
+    settings = {**default_settings, **{key: value for key, value in user_settings.items() if key in default_settings}}
 
-    if not validate_settings(settings):
+    if not validate_settings_schema(settings):
         raise UserWarning("User settings loaded from file were not valid.")
 
     return settings
 
 
+_default_settings = {"hmm_eval": 1e-15,
+                     "hmm_cov": 0.35,
+                     "genbank_query_size": 350,
+                     "raxml_command": "raxmlHPC-PTHREADS-AVX2",
+                     }
+
+
 def get_default_settings():
-    settings = {"hmm_eval": 1e-15,
-                "hmm_cov": 0.35,
-                "genbank_query_size": 350,
-                "raxml_command": "raxmlHPC-PTHREADS-AVX2",
-                }
+    # return a copy so that callers can't modify the defaults
+    return dict(_default_settings)
 
-    return settings
+
+@functools.lru_cache(maxsize=8)
+def _probe_raxml(raxml_path, mtime):
+    # mtime is only part of the cache key, so that replacing the executable invalidates the cached result
+    return run([raxml_path, "-v"], capture_output=True, check=True).stdout
+
+
+_setting_types = {"hmm_eval": float, "hmm_cov": float, "genbank_query_size": int}
 
 
 def validate_settings(settings):
+    validate_settings_schema(settings)
+    validate_raxml_availability(settings)
+    return True
 
-    if not type(settings["hmm_eval"]) == float:
-        raise UserWarning("hmm_eval is not a float value!")
-    if not type(settings["hmm_cov"]) == float:
-        raise UserWarning("hmm_cov is not a float value!")
-    if not type(settings["genbank_query_size"]) == int:
-        raise UserWarning("genbank_query_size is not a float value!")
+
+def validate_settings_schema(settings):
+    # only checks the setting values themselves, so this is cheap enough to run whenever settings are loaded
+    for key, setting_type in _setting_types.items():
+        # bool is a subclass of int, but true/false is never a valid value for these settings
+        if isinstance(settings[key], bool) or not isinstance(settings[key], setting_type):
+            raise UserWarning(f"{key} is not a valid {setting_type.__name__} value!")
     if settings["genbank_query_size"] > 500:
         raise UserWarning("genbank_query_size max value is 500!")
+    return True
+
+
+def validate_raxml_availability(settings):
+    # runs the configured RAxML command, so this is left to the callers that are about to use RAxML
+    not_found_msg = f"ERROR: cannot find command \"{settings['raxml_command']}\" on path. Check that RAxML is " \
+                    f"available on path with this exact spelling. Alternately, if this is the wrong name for " \
+                    f"your raxml command, consider changing it with "
+
+    # resolving the command on PATH first means a missing RAxML fails without spawning a process
+    raxml_path = shutil.which(settings["raxml_command"])
+    if raxml_path is None:
+        raise UserWarning(not_found_msg)
 
     try:
         # if sys.platform.startswith("win"):
@@ -251,8 +371,8 @@ def validate_settings(settings):
         #                           f"raxml is not installed on your WSL installation, please install raxml on WSL with"
         #                           f" the default executable names, such as the one above.")
         # else:
-        rax_info = run([settings["raxml_command"], "-v"], capture_output=True, check=True)
-        if not rax_info.stdout.__contains__(b"RAxML"):
+        rax_stdout = _probe_raxml(raxml_path, os.stat(raxml_path).st_mtime_ns)
+        if b"RAxML" not in rax_stdout:
             raise UserWarning(f"Command \"{settings['raxml_command']}\" does not appear to be RAxML. Check that RAxML "
                               f"is available on path with this exact spelling. "
                               # f"Alternatively, specify the full length "
@@ -261,13 +381,7 @@ def validate_settings(settings):
                               )
 
     except (FileNotFoundError, CalledProcessError) as file_e:
-        raise UserWarning(f"ERROR: cannot find command \"{settings['raxml_command']}\" on path. Check that RAxML is "
-                          f"available on path with this exact spelling. Alternately, if this is the wrong name for "
-                          f"your raxml command, consider changing it with "
-                          # f"Alternatively, specify the full length "
-                          # f"executable path as the RAxML argument like this: "
-                          # f"\n\t\"--raxml </full/path/to/RAxML_executable_file>\""
-                          ) from file_e
+        raise UserWarning(not_found_msg) from file_e
 
     # if not (settings["raxml_command"] == "raxmlHPC-PTHREADS-AVX2" or
     #         settings["raxml_command"] == "raxmlHPC-PTHREADS-SSE3" or
@@ -281,33 +395,63 @@ def validate_settings(settings):
     return True
 
 
-def save_to_file(settings_dict, settings_path: str | os.PathLike = default_settings_path, api_key=None,
-                 folder_config=default_folder_config):
-    if not os.path.exists(os.path.dirname(settings_path)):
-        os.makedirs(os.path.dirname(settings_path))
+def _is_env_assignment(line: str, key: str) -> bool:
+    name, separator, _ = line.partition('=')
+    return bool(separator) and name.strip() == key
+
 
+def save_to_file(settings_dict, settings_path: str | os.PathLike = None, api_key=None,
+                 folder_config: str | os.PathLike = None):
+    if settings_path is None:
+        settings_path = get_settings_path()
+    if folder_config is None:
+        folder_config = get_config_folder()
+    os.makedirs(os.path.dirname(settings_path), exist_ok=True)
+
+    # json.dump() calls write() once per encoded chunk, so serialize first and write the file in one call
     with open(settings_path, 'w', encoding="utf-8") as sfile:
-        json.dump(settings_dict, sfile, ensure_ascii=False, indent=4)
+        sfile.write(json.dumps(settings_dict, ensure_ascii=False, indent=4))
+    global _user_settings_cache
+    _user_settings_cache = None
 
     if api_key:
+        env_path = os.path.join(folder_config, ".env")
         try:
-            with open(os.path.join(folder_config, ".env"), 'r', encoding="utf-8") as env_file:
+            with open(env_path, 'r', encoding="utf-8") as env_file:
                 lines = env_file.readlines()
         except IOError:
             lines = []
 
-        new_lines = [(line + '\n' if line[-1] != '\n' else line) for line in lines]
+        # keep every line except old API_KEY assignments exactly as the user wrote it, only making sure each kept line
+        # is newline terminated so the new key starts on its own line
+        new_lines = [(line if line.endswith('\n') else line + '\n') for line in lines
+                     if not _is_env_assignment(line, "API_KEY")]
 
         # if email:
-        #     new_lines = [line for line in new_lines if line[0:5] != "EMAIL"]
+        #     new_lines = [line for line in new_lines if not _is_env_assignment(line, "EMAIL")]
         #     new_lines.append(f"EMAIL={email}\n")
+        new_lines.append(f"API_KEY={api_key}\n")
+
+        # write to a temporary file and swap it in, so that a crash part way through can't leave a truncated .env
+        # The file holds the NCBI API key, so the temporary file is created readable only by the user and then given the
+        # permissions of the .env it replaces, the same as rewriting .env in place would keep them.
+        temp_env_path = f"{env_path}.tmp"
+        with open(temp_env_path, 'w', encoding="utf-8",
+                  opener=lambda path, flags: os.open(path, flags, 0o600)) as env_file:
+            env_file.write(''.join(new_lines))
+        try:
+            shutil.copymode(env_path, temp_env_path)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_env_path, env_path)
+        reload_env()
 
-        if api_key:
-            new_lines = [line for line in new_lines if line[0:7] != "API_KEY"]
-            new_lines.append(f"API_KEY={api_key}\n")
 
-        with open(os.path.join(folder_config, ".env"), 'w', encoding="utf-8") as env_file:
-            env_file.writelines(new_lines)
+# cli_config argument names mapped to the advanced setting each one sets
+_arg_to_setting = {"hmm_eval": "hmm_eval",
+                   "hmm_cov": "hmm_cov",
+                   "querysize": "genbank_query_size",
+                   "raxml_command": "raxml_command"}
 
 
 def cli_config():
@@ -375,46 +519,42 @@ def cli_config():
     changes = False
     software_settings = get_user_settings()
     current_package_settings = get_package_settings()
-    settings_path = default_settings_path
-    config_folder = default_folder_config
-
-    # Note: Using both expanduser and abspath so that relative paths with '.' for current working directory
-    # or '~' for user's home folders are saved correctly. Otherwise, ambiguous locations might try to save/load
-    # database files form incorrect locations in the future and cause database installation/update issues.
-    user_data_folder = os.path.abspath(os.path.expanduser(args.user_data_folder))
+    settings_path = get_settings_path()
+    config_folder = get_config_folder()
 
-    if args.hmm_eval:
-        software_settings["hmm_eval"] = args.hmm_eval
-        changes = True
-    if args.hmm_cov:
-        software_settings["hmm_cov"] = args.hmm_cov
-        changes = True
-    if args.querysize:
-        software_settings["genbank_query_size"] = args.querysize
-        changes = True
-    if args.raxml_command:
-        software_settings["raxml_command"] = args.raxml_command
+    args_dict = vars(args)
+    updates = {setting: args_dict[arg] for arg, setting in _arg_to_setting.items() if args_dict[arg] is not None}
+    if updates:
+        software_settings.update(updates)
         changes = True
     if args.user_data_folder:
+        # Note: Using both expanduser and abspath so that relative paths with '.' for current working directory
+        # or '~' for user's home folders are saved correctly. Otherwise, ambiguous locations might try to save/load
+        # database files form incorrect locations in the future and cause database installation/update issues.
+        user_data_folder = os.path.abspath(os.path.expanduser(args.user_data_folder))
+        old_user_data_folder = current_package_settings["user_data_folder"]
         if not os.path.exists(user_data_folder):
             print(f"{user_data_folder} folder for SACCHARIS files does not exist!\nPlease choose an existing "
                   f"folder to store SACCHARIS data folder in.")
-        else:
-            old_user_data_folder = current_package_settings["user_data_folder"]
+        elif user_data_folder != old_user_data_folder:
+            # new folder paths are only needed when the data folder is actually moving
+            changes = True
             old_saccharis_folder = os.path.join(old_user_data_folder, "saccharis")
-            current_package_settings["user_data_folder"] = user_data_folder
-            new_user_dir = current_package_settings["user_data_folder"]
-            new_saccharis_folder = os.path.join(new_user_dir, "saccharis")
+            new_saccharis_folder = os.path.join(user_data_folder, "saccharis")
             config_folder = os.path.join(new_saccharis_folder, "config")
             settings_path = os.path.join(config_folder, "advanced_settings.json")
+            current_package_settings["user_data_folder"] = user_data_folder
 
-            if old_user_data_folder != current_package_settings["user_data_folder"]:
-                changes = True
+            try:
+                # a rename is near instant when both folders are on the same filesystem
+                os.rename(old_saccharis_folder, new_saccharis_folder)
+            except OSError:
+                # different filesystems, or the new folder already exists and the contents need to be merged into it
                 shutil.copytree(old_saccharis_folder, new_saccharis_folder, dirs_exist_ok=True)
                 shutil.rmtree(old_saccharis_folder)
-                if current_package_settings["database_folder"] == os.path.join(old_saccharis_folder, "db"):
-                    current_package_settings["database_folder"] = os.path.join(new_saccharis_folder, "db")
-                save_package_settings(current_package_settings)
+            if current_package_settings.get("database_folder") == os.path.join(old_saccharis_folder, "db"):
+                current_package_settings["database_folder"] = os.path.join(new_saccharis_folder, "db")
+            save_package_settings(current_package_settings)
 
     if args.restore_defaults:
         software_settings = get_default_settings()
@@ -1,16 +1,23 @@
 import argparse
+import concurrent.futures
+import functools
+import hashlib
+import json
 import os
 import pathlib
+import threading
 import time
 
 import requests
 import shutil
 import subprocess
 import sys
+import tarfile
 from logging import Logger, getLogger
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, ConnectionError, HTTPError
-from pathlib import PurePath
-from urllib3.exceptions import ReadTimeoutError
+from urllib.parse import urlsplit
+from urllib3.exceptions import ProtocolError, ReadTimeoutError
 
 from saccharis.utils.NetworkingHelpers import resolve_hostname, get_dns_servers
 from saccharis.utils.PipelineErrors import PipelineException, FileError, make_logger
@@ -18,8 +25,12 @@ from saccharis.utils.AdvancedConfig import get_db_folder, get_package_settings,
 from saccharis.utils.Formatting import convert_path_wsl
 
 MAX_RETRIES = 10
+# Database files are independent of each other, so several are downloaded at once to overlap network waits
+MAX_DOWNLOAD_WORKERS = 6
 DELAY = 30
-CHUNK_SIZE: int = 4096
+CHUNK_SIZE: int = 131072
+# chunk size is halved after each timeout, but not below this since very small chunks make the download loop CPU bound
+MIN_CHUNK_SIZE: int = 16384
 
 links_last_updated = "November, 2024"
 urls_and_process_and_rename = \
@@ -37,12 +48,177 @@ urls_and_process_and_rename = \
      ("https://bcb.unl.edu/dbCAN2/download/Databases/V13/CAZyDB.07142024.fa", "diamond", "CAZy.fa")
      ]
 
-files_to_skip_deletion = ["dbCAN.txt"]
-dbcan_txt_files = ["dbCAN.txt.h3f", "dbCAN.txt.h3i", "dbCAN.txt.h3m", "dbCAN.txt.h3p"]
+files_to_skip_deletion = frozenset({"dbCAN.txt"})
+dbcan_txt_files = ("dbCAN.txt.h3f", "dbCAN.txt.h3i", "dbCAN.txt.h3m", "dbCAN.txt.h3p")
+
+# Stores the ETag and Last-Modified headers of each downloaded url in the database folder, so that forced updates can
+# ask the server whether a file changed and skip downloading it again when it hasn't. The sha256 hash of each download
+# is stored too, so that hmmpress/diamond are only rerun on a downloaded file that actually changed.
+download_metadata_filename = ".download_meta.json"
+completion_marker_suffix = ".ok"
+_download_metadata_lock = threading.Lock()
+
+
+# All the database files come from the same host, so when a connection problem makes every download fail, the
+# diagnostic DNS lookups in the error handlers are only done once instead of for each file. download_database() clears
+# these caches, so a later update in the same process (e.g. from the GUI) doesn't log stale DNS results.
+@functools.lru_cache(maxsize=16)
+def _resolve_host(hostname: str):
+    return resolve_hostname(f"//{hostname}")
+
+
+@functools.lru_cache(maxsize=1)
+def _dns_servers():
+    return get_dns_servers()
+
+
+def load_download_metadata(output_folder: str | os.PathLike) -> dict:
+    try:
+        with open(os.path.join(output_folder, download_metadata_filename), 'rb') as metadata_file:
+            return json.loads(metadata_file.read())
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_download_metadata(output_folder: str | os.PathLike, url: str, headers, sha256: str = None,
+                           content_length: str = None) -> None:
+    # content_length overrides the Content-Length header, which after a resumed download only covers the last range
+    if content_length is None:
+        content_length = headers.get("Content-Length")
+    # downloads run concurrently, so the read-modify-write of the shared metadata file is done under a lock
+    with _download_metadata_lock:
+        metadata = load_download_metadata(output_folder)
+        metadata[url] = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"),
+                         "content_length": content_length, "sha256": sha256}
+        metadata_path = os.path.join(output_folder, download_metadata_filename)
+        # written to a temporary file first, so an interrupted write can't leave behind a truncated metadata file
+        with open(f"{metadata_path}.tmp", 'w', encoding="utf-8") as metadata_file:
+            metadata_file.write(json.dumps(metadata, indent=4))
+        os.replace(f"{metadata_path}.tmp", metadata_path)
+
+
+def get_conditional_headers(output_folder: str | os.PathLike, url: str) -> dict:
+    url_metadata = load_download_metadata(output_folder).get(url, {})
+    headers = {}
+    if url_metadata.get("etag"):
+        headers["If-None-Match"] = url_metadata["etag"]
+    if url_metadata.get("last_modified"):
+        headers["If-Modified-Since"] = url_metadata["last_modified"]
+    return headers
+
+
+def matches_download_metadata(output_folder: str | os.PathLike, url: str, headers) -> bool:
+    # Not every server answers conditional requests with 304, so the headers of a full response are also compared
+    # against the ones saved for the last download, before any of the response body is read.
+    url_metadata = load_download_metadata(output_folder).get(url, {})
+    if url_metadata.get("etag"):
+        return url_metadata["etag"] == headers.get("ETag")
+    return url_metadata.get("last_modified") is not None and url_metadata.get("content_length") is not None and \
+        url_metadata["last_modified"] == headers.get("Last-Modified") and \
+        url_metadata["content_length"] == headers.get("Content-Length")
+
+
+def _remove_unprocessed_file(output_path: str, logger: Logger) -> None:
+    if os.path.basename(output_path) not in files_to_skip_deletion:
+        os.remove(output_path)
+        logger.debug(f"Removed {output_path}")
+
+
+def _run_hmmpress(output_path: str, output_folder: str | os.PathLike, logger: Logger) -> None:
+    if sys.platform.startswith("win"):
+        win_hmmpress_path = convert_path_wsl(output_path)
+        subprocess.run(["wsl", "hmmpress", "-f", win_hmmpress_path], check=True)
+    else:
+        subprocess.run(["hmmpress", "-f", output_path], check=True)
+    _remove_unprocessed_file(output_path, logger)
+
+
+def _run_tar(output_path: str, output_folder: str | os.PathLike, logger: Logger) -> None:
+    with tarfile.open(output_path, 'r:*') as tar:
+        if hasattr(tarfile, "data_filter"):
+            # safe extraction filter, only available from python 3.11.4
+            tar.extractall(output_folder, filter="data")
+        else:
+            tar.extractall(output_folder)
+
+
+def _run_makeblastdb(output_path: str, output_folder: str | os.PathLike, logger: Logger) -> None:
+    subprocess.run(["makeblastdb", "-in", output_path, "-dbtype", "prot"], check=True)
+
+
+def _run_diamond(output_path: str, output_folder: str | os.PathLike, logger: Logger) -> None:
+    subprocess.run(["diamond", "makedb", "--in", output_path, "-d", os.path.splitext(output_path)[0]], check=True)
+    _remove_unprocessed_file(output_path, logger)
+
+
+# Maps each process type to a function giving the paths of the files it produces, which are used to check whether a
+# download was already processed, and the function that runs the process on a downloaded file. The first path is the
+# one reported to the user.
+process_handlers = {
+    "hmmpress": (lambda path: tuple(f"{path}.h3{ext}" for ext in "fimp"), _run_hmmpress),
+    "diamond": (lambda path: (f"{os.path.splitext(path)[0]}.dmnd",), _run_diamond),
+    "tar": (lambda path: (path,), _run_tar),
+    "makeblastdb": (lambda path: (path,), _run_makeblastdb),
+    None: (lambda path: (path,), None),
+}
+
+
+def get_output_paths(url, output_folder: str | os.PathLike, process: str = None,
+                     new_filename: str = None) -> tuple[str, tuple[str, ...], str]:
+    """
+    Works out where a database file is downloaded to and the files that show it has been processed.
+
+    :return: Returns the download path, the paths of the files produced by processing it, and the path of its
+    completion marker.
+    """
+    output_path = os.path.join(output_folder, new_filename if new_filename else os.path.basename(url))
+    try:
+        get_processed_path = process_handlers[process][0]
+    except KeyError as err:
+        raise ValueError(f"Unknown database process type: {process}") from err
+    return output_path, get_processed_path(output_path), f"{output_path}{completion_marker_suffix}"
+
+
+def is_processed(processed_filepaths: tuple[str, ...], completion_marker: str, existing_files: set[str] = None) -> bool:
+    # The marker is only written once a file has been fully downloaded and processed, so processed files without it were
+    # left behind by a failed run. Folders installed before the marker existed can't be told apart from those, so they
+    # are downloaded again once. The processed files are checked too, so that deleting one of them makes the file
+    # download again even though its marker is still there.
+    if existing_files is None:
+        return all(os.path.exists(path) for path in (*processed_filepaths, completion_marker))
+    return all(os.path.basename(path) in existing_files for path in (*processed_filepaths, completion_marker))
+
+
+def restore_dbcan_txt(output_folder: str | os.PathLike) -> None:
+    # Below code exists to create a dbCAN.txt dummy file if it's accidentally deleted. It's not strictly
+    # necessary, but run-dbcan checks for it and fails if not present even if the dbCAN.txt.h3* files are present.
+    # In theory this is unneeded since we don't delete files in files_to_skip_deletion, but some systems
+    # delete dbCAN.txt anyway for mysterious reasons, so I added this check.
+    dbcan_txt_path = os.path.join(output_folder, "dbCAN.txt")
+    if not os.path.isfile(dbcan_txt_path):
+        dbcan_txt_exists = [os.path.exists(os.path.join(output_folder, dbcan_txt_file))
+                            for dbcan_txt_file in dbcan_txt_files]
+        if all(dbcan_txt_exists):
+            pathlib.Path(dbcan_txt_path).touch(exist_ok=True)
+
+
+def check_url(url: str, session: requests.Session = None) -> tuple[str, bool]:
+    """
+    Sends a HEAD request to check that a database file can be downloaded from a url.
+
+    :return: Returns the url and whether it is available.
+    """
+    try:
+        response = (session or requests).head(url, timeout=10, allow_redirects=True)
+    except RequestException:
+        return url, False
+    # servers that don't support HEAD requests can still serve the file
+    return url, response.status_code < 400 or response.status_code in (405, 501)
 
 
 def download_and_process(url, output_folder: str | os.PathLike, process: str = None, new_filename: str = None,
-                         force_download: bool = False, logger: Logger = getLogger()) -> bool:
+                         force_download: bool = False, logger: Logger = getLogger(),
+                         existing_files: set[str] = None, session: requests.Session = None) -> bool:
     """
     Downloads and formats a database file used for dbCAN HMMer analysis.
 
@@ -51,25 +227,31 @@ def download_and_process(url, output_folder: str | os.PathLike, process: str = N
     :param process: type of process to unpack the database.
     :param new_filename: What to rename a downloaded file to prior to processing, if necessary.
     :param force_download: Forces a new download and process operation even if the files already exist.
+    :param existing_files: Names of the files already in output_folder, if known. Saves checking the disk for each file
+    when several files are processed into the same folder.
+    :param session: requests session to download with, so that connections can be reused across several downloads.
     :return: Returns whether a file was downloaded from the URL.
     """
     logger.debug(f"download_and_process() called with url:{url}; output_folder:{output_folder}; process:{process}; "
                  f"new_filename:{new_filename}; force_download:{force_download}")
 
     downloaded = False
-    if new_filename:
-        output_path = os.path.join(output_folder, new_filename)
-    else:
-        output_path = os.path.join(output_folder, os.path.basename(url))
-
-    # processed_filepath = f"{output_path}.h3f" if process == "hmmpress" else \
-    #     f"{PurePath(output_path).parent / PurePath(output_path).stem}.dmnd" if process == "diamond" else output_path
-    processed_filepath = f"{output_path}.h3f" if process == "hmmpress" else \
-        PurePath(output_path).with_suffix(".dmnd") if process == "diamond" else output_path
-
-    if not os.path.exists(processed_filepath) or force_download:
-        print(f"dbCAN file {processed_filepath} not found, downloading...")
-        logger.info(f"dbCAN file {processed_filepath} not found, downloading...")
+    output_path, processed_filepaths, completion_marker = get_output_paths(url, output_folder, process, new_filename)
+    processed_filepath = processed_filepaths[0]
+    run_process = process_handlers[process][1]
+
+    processed_file_exists = is_processed(processed_filepaths, completion_marker, existing_files)
+    if not processed_file_exists or force_download:
+        if processed_file_exists:
+            # we already have a processed copy, so only download again if the server has a newer file
+            request_headers = get_conditional_headers(output_folder, url)
+            print(f"Checking for update to dbCAN file {processed_filepath}...")
+            logger.info(f"Checking for update to dbCAN file {processed_filepath}...")
+        else:
+            request_headers = {}
+            print(f"dbCAN file {processed_filepath} not found, downloading...")
+            logger.info(f"dbCAN file {processed_filepath} not found, downloading...")
+        not_modified = False
 
         # todo: remove this old wget file download code once confirmed requests download works
         # try:
@@ -83,122 +265,170 @@ def download_and_process(url, output_folder: str | os.PathLike, process: str = N
         #     logger.debug(err)
         #     logger.exception(msg)
         #     raise PipelineException(msg) from err
-        global DELAY
-        global CHUNK_SIZE
-
-        for attempt in range(MAX_RETRIES):
+        # back-off is kept per download, so one slow file doesn't slow down the retries and chunks of the others
+        delay = DELAY
+        chunk_size = CHUNK_SIZE
+
+        # the download is written to a .part file and only renamed once complete, so an interrupted download never
+        # leaves a truncated file under the real name
+        part_path = f"{output_path}.part"
+        try:
+            # ETag or Last-Modified of the file being downloaded, used to resume it after a failed attempt
+            resume_validator = None
+            source_hash = None
+            # length of the whole file, saved with the download metadata
+            full_length = None
+            for attempt in range(MAX_RETRIES):
+                try:
+                    # ask for the file uncompressed, so that its length can always be checked against Content-Length
+                    # and a partial download can be resumed with a byte range
+                    attempt_headers = {**request_headers, "Accept-Encoding": "identity"}
+                    if resume_validator and os.path.exists(part_path):
+                        # If-Range makes the server send the whole file instead if it changed since the last attempt
+                        attempt_headers = {**attempt_headers, "Range": f"bytes={os.path.getsize(part_path)}-",
+                                           "If-Range": resume_validator}
+                    response = (session or requests).get(url, stream=True, timeout=120, headers=attempt_headers)
+                    response.raise_for_status()
+                    if response.status_code == 304 or \
+                            (processed_file_exists and matches_download_metadata(output_folder, url, response.headers)):
+                        response.close()
+                        not_modified = True
+                        break
+                    resumed = response.status_code == 206
+                    if not resumed and "Content-Encoding" not in response.headers:
+                        # byte ranges refer to the encoded body, so only unencoded downloads can be resumed
+                        etag = response.headers.get("ETag")
+                        resume_validator = etag if etag and not etag.startswith("W/") else \
+                            response.headers.get("Last-Modified")
+                    # read straight from the raw response stream, decoding any gzip transfer encoding the way
+                    # iter_content would. The file is hashed as it is written, so it never has to be read back.
+                    response.raw.decode_content = True
+                    if resumed:
+                        with open(part_path, 'rb') as partial_file:
+                            hasher = hashlib.file_digest(partial_file, "sha256")
+                    else:
+                        hasher = hashlib.sha256()
+                    with open(part_path, 'ab' if resumed else 'wb') as f:
+                        start_position = f.tell()
+                        # consider lowering chunk size to solve proteus download issues???
+                        while chunk := response.raw.read(chunk_size):
+                            f.write(chunk)
+                            hasher.update(chunk)
+                        bytes_written = f.tell() - start_position
+                    # Content-Length counts the bytes sent over the wire, so it is compared with the raw byte count,
+                    # which still works if a server compresses the body despite the Accept-Encoding header
+                    expected_length = response.headers.get("Content-Length")
+                    bytes_received = response.raw.tell()
+                    if expected_length is not None and int(expected_length) != bytes_received:
+                        raise ConnectionError(f"Download of {url} ended after {bytes_received} of {expected_length} "
+                                              f"bytes")
+                    os.replace(part_path, output_path)
+                    source_hash = hasher.hexdigest()
+                    if resumed:
+                        # a 206 response's Content-Length is only the length of the range, the Content-Range header
+                        # ends with the length of the whole file, or "*" if the server doesn't know it
+                        total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                        full_length = total if total.isdigit() else str(start_position + bytes_written)
+                    logger.info(f"requests did not error on {url}")
+                    break  # exit retry loop on success
+                except (TimeoutError, ReadTimeoutError) as err:
+                    if attempt < MAX_RETRIES - 1:
+                        time.sleep(delay)
+                        delay *= 2
+                        chunk_size = max(int(chunk_size / 2), MIN_CHUNK_SIZE)
+                        msg = f"Failed to download from {url} on attempt {attempt} due to ConnectionError. Retrying..."
+                        logger.debug(msg)
+                        continue
+                    msg = f"Failed to download file {output_path} from url {url} due to timeout. Please try again " \
+                          f"later."
+                    logger.debug(err)
+                    logger.exception(msg)
+                    raise PipelineException(msg) from err
+                except HTTPError as err:
+                    msg = f"Failed to download file {output_path} from url {url} due to HTTP error. " \
+                          f"Please try again later."
+                    logger.debug(err)
+                    logger.debug(_resolve_host(urlsplit(url).hostname))
+                    logger.debug(_dns_servers())
+                    logger.exception(msg)
+                    raise PipelineException(msg) from err
+                except (ConnectionError, ProtocolError) as err:
+                    if attempt < MAX_RETRIES - 1:
+                        time.sleep(delay)
+                        delay *= 2
+                        chunk_size = max(int(chunk_size / 2), MIN_CHUNK_SIZE)
+                        msg = f"Failed to download from {url} on attempt {attempt} due to ConnectionError. Retrying..."
+                        logger.debug(msg)
+                        continue
+                    msg = f"Failed to download file from url {url} due to a connection error. May be caused by DNS " \
+                          f"issues, check that your system can communicate with DNS servers, sometimes VPN software " \
+                          f"or enterprise network settings interfere with DNS resolution."
+                    logger.debug(err)
+                    logger.debug(_resolve_host(urlsplit(url).hostname))
+                    logger.debug(_dns_servers())
+                    logger.exception(msg)
+                    raise PipelineException(msg) from err
+                except RequestException as err:
+                    msg = f"Failed to download file from url {url} due to a request error. There may be issues with " \
+                          f"the server, please try again later."
+                    logger.debug(err)
+                    logger.exception(msg)
+                    raise PipelineException(msg) from err
+                except OSError as err:
+                    msg = f"File I/O error occurred while accessing {output_path}. Check that you have write " \
+                          f"permissions for this directory. You can change the database installation folder with the " \
+                          f"saccharis.update_db command if necessary."
+                    logger.debug(err)
+                    logger.exception(msg)
+                    raise PipelineException(msg) from err
+                except Exception as err:
+                    msg = f"Failed to download file {output_path} from url {url} due to generic Exception."
+                    logger.debug(err)
+                    logger.exception(msg)
+                    raise PipelineException(msg) from err
+
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+
+        if not_modified:
+            msg = f"{url} has not changed since it was last downloaded, keeping existing file {processed_filepath}"
+            print(msg)
+            logger.info(msg)
+        else:
+            downloaded = True
             try:
-                response = requests.get(url, stream=True, timeout=120)
-                response.raise_for_status()
-                with open(output_path, 'wb') as f:
-                    # consider lowering chunk size to solve proteus download issues???
-                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-                        f.write(chunk)
-                logger.info(f"requests did not error on {url}")
-                break  # exit retry loop on success
-            except (TimeoutError, ReadTimeoutError) as err:
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(DELAY)
-                    DELAY *= 2
-                    CHUNK_SIZE = max(int(CHUNK_SIZE / 2), 512)
-                    msg = f"Failed to download from {url} on attempt {attempt} due to ConnectionError. Retrying..."
-                    logger.debug(msg)
-                    continue
-                msg = f"Failed to download file {output_path} from url {url} due to timeout. Please try again later."
-                logger.debug(err)
-                logger.exception(msg)
-                raise PipelineException(msg) from err
-            except HTTPError as err:
-                msg = f"Failed to download file {output_path} from url {url} due to HTTP error. " \
-                      f"Please try again later."
-                logger.debug(err)
-                logger.debug(resolve_hostname(url))
-                logger.debug(get_dns_servers())
-                logger.exception(msg)
-                raise PipelineException(msg) from err
-            except ConnectionError as err:
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(DELAY)
-                    DELAY *= 2
-                    CHUNK_SIZE = max(int(CHUNK_SIZE / 2), 512)
-                    msg = f"Failed to download from {url} on attempt {attempt} due to ConnectionError. Retrying..."
-                    logger.debug(msg)
-                    continue
-                msg = f"Failed to download file from url {url} due to a connection error. May be caused by DNS issues, " \
-                      f"check that your system can communicate with DNS servers, sometimes VPN software or enterprise " \
-                      f"network settings interfere with DNS resolution."
-                logger.debug(err)
-                logger.debug(resolve_hostname(url))
-                logger.debug(get_dns_servers())
-                logger.exception(msg)
-                raise PipelineException(msg) from err
-            except RequestException as err:
-                msg = f"Failed to download file from url {url} due to a request error. There may be issues with the " \
-                      f"server, please try again later."
-                logger.debug(err)
-                logger.exception(msg)
-                raise PipelineException(msg) from err
-            except OSError as err:
-                msg = f"File I/O error occurred while accessing {output_path}. Check that you have write permissions for " \
-                      f"this directory. You can change the database installation folder with the saccharis.update_db " \
-                      f"command if necessary."
-                logger.debug(err)
-                logger.exception(msg)
-                raise PipelineException(msg) from err
-            except Exception as err:
-                msg = f"Failed to download file {output_path} from url {url} due to generic Exception."
-                logger.debug(err)
-                logger.exception(msg)
-                raise PipelineException(msg) from err
-
-        downloaded = True
-
-        # todo: delete this rename, unneeded with reworked requests download
-        # if new_filename:
-        #     shutil.move(downloaded_file, output_path)
-
-        if not os.path.isfile(output_path):
-            msg = f"{output_path} file does not exist! Error downloading and/or processing this file."
-            logger.error(msg)
-            raise FileError(msg)
-
-        if process == "hmmpress":
-            if sys.platform.startswith("win"):
-                win_hmmpress_path = convert_path_wsl(output_path)
-                subprocess.run(["wsl", "hmmpress", "-f", win_hmmpress_path], check=True)
-            else:
-                subprocess.run(["hmmpress", "-f", output_path], check=True)
-            if os.path.basename(output_path) not in files_to_skip_deletion:
-                os.remove(output_path)
-                logger.debug(f"Removed {output_path}")
-        elif process == "tar":
-            if sys.platform.startswith("win"):
-                win_tar_path = convert_path_wsl(output_path)
-                subprocess.run(["wsl", "tar", "xvf", win_tar_path], check=True)
-            else:
-                subprocess.run(["tar", "xvf", output_path], check=True)
-        elif process == "makeblastdb":
-            subprocess.run(["makeblastdb", "-in", output_path, "-dbtype", "prot"], check=True)
-        elif process == "diamond":
-            output_path_obj = pathlib.PurePath(output_path)
-            diamond_output_path = output_path_obj.parent / output_path_obj.stem
-            subprocess.run(["diamond", "makedb", "--in", output_path, "-d", diamond_output_path], check=True)
-            if os.path.basename(output_path) not in files_to_skip_deletion:
-                os.remove(output_path)
-                logger.debug(f"Removed {output_path}")
+                os.remove(completion_marker)
+            except FileNotFoundError:
+                pass
+
+            # todo: delete this rename, unneeded with reworked requests download
+            # if new_filename:
+            #     shutil.move(downloaded_file, output_path)
+
+            if not os.path.isfile(output_path):
+                msg = f"{output_path} file does not exist! Error downloading and/or processing this file."
+                logger.error(msg)
+                raise FileError(msg)
+
+            # hmmpress and diamond take minutes on the larger databases, so their output is only rebuilt when the
+            # downloaded file differs from the one it was last built from. Output left behind by a failed run is never
+            # reused, since it only counts as processed when the run that built it finished.
+            if processed_filepath != output_path and processed_file_exists and \
+                    source_hash == load_download_metadata(output_folder).get(url, {}).get("sha256"):
+                msg = f"{output_path} is unchanged since {processed_filepath} was built, skipping {process}"
+                print(msg)
+                logger.info(msg)
+                _remove_unprocessed_file(output_path, logger)
+            elif run_process:
+                run_process(output_path, output_folder, logger)
+            save_download_metadata(output_folder, url, response.headers, source_hash, full_length)
+        pathlib.Path(completion_marker).touch(exist_ok=True)
     else:
-        logger.debug(f"Size of {processed_filepath}: {os.path.getsize(processed_filepath)}")
         logger.info(f"{processed_filepath} already exists!")
 
-    # Below code exists to create a dbCAN.txt dummy file if it's accidentally deleted. It's not strictly
-    # necessary, but run-dbcan checks for it and fails if not present even if the dbCAN.txt.h3* files are present.
-    # In theory this is unneeded since we don't delete files in the files_to_skip_deletion list, but some systems
-    # delete dbCAN.txt anyway for mysterious reasons, so I added this check.
-    if new_filename == "dbCAN.txt" and not os.path.isfile(output_path):
-        dbcan_txt_exists = [os.path.exists(os.path.join(output_folder, dbcan_txt_file))
-                                for dbcan_txt_file in dbcan_txt_files]
-        if all(dbcan_txt_exists):
-            pathlib.Path(output_path).touch(exist_ok=True)
+    if new_filename == "dbCAN.txt":
+        restore_dbcan_txt(output_folder)
 
     return downloaded
 
@@ -265,25 +495,32 @@ def cli_update_hmms():
         logger.debug(PipelineException.__traceback__)
 
 
-def download_database(db_install_folder: str | os.PathLike = get_db_folder(), force_download: bool = False,
+def download_database(db_install_folder: str | os.PathLike = None, force_download: bool = False,
                       logger: Logger = getLogger()) -> int:
     """
     Downloads and formats all database files used for dbCAN HMMer analysis.
 
-    :param db_install_folder: Folder to output downloaded and processed files to.
+    :param db_install_folder: Folder to output downloaded and processed files to. Defaults to the configured database
+    folder.
     :param force_download: Forces a new download and process operation even if the files already exist.
     :return: Returns the number of files downloaded and processed. The number of files created can be greater, as some
     downloaded files are processed into multiple output files.
     """
 
+    if db_install_folder is None:
+        db_install_folder = get_db_folder(logger)
+    _resolve_host.cache_clear()
+    _dns_servers.cache_clear()
+
     msg = f"download_database() called with db_install_folder:{db_install_folder} and force_download:{force_download}"
     logger.debug(msg)
     downloaded: int = 0
     # set up folder and download dbCAN2 database files if not already present
-    if not os.path.isdir(db_install_folder):
-        msg = f"{db_install_folder} not found, creating directory..."
-        logger.info(msg)
+    try:
         os.makedirs(db_install_folder, 0o755)
+        logger.info(f"{db_install_folder} not found, created directory.")
+    except FileExistsError:
+        pass
 
     # todo: delete below after confirmed it's been replaced properly
     # if not os.path.exists(os.path.join(db_install_folder, "CAZy.dmnd")) or force_download:
@@ -312,11 +549,49 @@ def download_database(db_install_folder: str | os.PathLike = get_db_folder(), fo
     #     else:
     #         subprocess.run(["hmmpress", os.path.join(db_install_folder, "dbCAN.txt")])
 
-    for url, process_type, new_file in urls_and_process_and_rename:
-        result = download_and_process(url, db_install_folder, process_type, new_filename=new_file,
-                                      force_download=force_download, logger=logger)
-        if result:
-            downloaded += 1
-        logger.debug(f"{downloaded} files downloaded.")
-
+    # list the folder once up front, instead of checking for each processed file separately
+    existing_files = {entry.name for entry in os.scandir(db_install_folder)}
+    pending = urls_and_process_and_rename
+    if not force_download:
+        # skip already processed files up front, so that a fully installed database doesn't start any downloads
+        pending = [(url, process_type, new_file) for url, process_type, new_file in urls_and_process_and_rename
+                   if not is_processed(*get_output_paths(url, db_install_folder, process_type, new_file)[1:],
+                                       existing_files=existing_files)]
+        logger.info(f"{len(urls_and_process_and_rename) - len(pending)} database files already exist.")
+    if not pending:
+        restore_dbcan_txt(db_install_folder)
+        return downloaded
+
+    max_workers = min(MAX_DOWNLOAD_WORKERS, len(pending))
+    # all the files come from the same server, so one session lets the downloads reuse open connections
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers, max_retries=0)
+    with requests.Session() as session, \
+            concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # check every link before starting any downloads, so an outage or a dead link fails in seconds rather than
+        # after the other files have spent minutes downloading
+        unavailable = [url for url, available in executor.map(lambda entry: check_url(entry[0], session), pending)
+                       if not available]
+        if unavailable:
+            msg = f"The dbCAN database server appears to be unavailable, could not reach: {', '.join(unavailable)}. " \
+                  f"Please try again later."
+            logger.error(msg)
+            raise PipelineException(msg)
+        futures = [executor.submit(download_and_process, url, db_install_folder, process_type, new_filename=new_file,
+                                   force_download=force_download, logger=logger, existing_files=existing_files,
+                                   session=session)
+                   for url, process_type, new_file in pending]
+        try:
+            for future in concurrent.futures.as_completed(futures):
+                if future.result():
+                    downloaded += 1
+                logger.debug(f"{downloaded} files downloaded.")
+        except Exception:
+            # don't start any more downloads once one has failed, downloads already in progress are allowed to finish
+            for future in futures:
+                future.cancel()
+            raise
+
+    restore_dbcan_txt(db_install_folder)
     return downloaded
@@ -20,13 +20,30 @@ from saccharis.utils.UserInput import ask_yes_no
 from saccharis.utils.PipelineErrors import UserError
 from saccharis.utils.AdvancedConfig import get_config_folder
 
-folder_config = get_config_folder()
 all_families_filename = "all_families.json"
 fam_lists_filename = "family_categories.json"
-default_fam_lists_file_path = os.path.join(folder_config, fam_lists_filename)
+
+
+# The config folder depends on the package settings file, so like the folder paths in AdvancedConfig it is only resolved
+# on first use. This keeps importing this module (e.g. just for Matcher) free of file I/O. folder_config and
+# default_fam_lists_file_path are still available as module attributes for backwards compatibility.
+def _default_fam_lists_file_path():
+    return os.path.join(get_config_folder(), fam_lists_filename)
+
+
+def __getattr__(name):
+    # only called for names not found in the module globals, see PEP 562
+    if name == "folder_config":
+        return get_config_folder()
+    if name == "default_fam_lists_file_path":
+        return _default_fam_lists_file_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 _DELETEDFAMILYLIST = ["CBM33", "CBM7", "CE10", "GH145", "GH155", "GH21", "GH40", "GH41", "GH60", "GH61", "GH69", "GT36",
                       "PL19"]
+# used for membership tests, which happen for every family name that gets validated
+_DELETED_FAMILIES = frozenset(_DELETEDFAMILYLIST)
 
 
 class WriteMode(Enum):
@@ -35,40 +52,66 @@ class WriteMode(Enum):
     REPLACE = 2
 
 
-class Matcher:
-    cazy_fam_regex = re.compile(r"((GH)|(PL)|(GT)|(CE)|(AA)|(CBM))\d+(_\d+)?")
+# non-capturing, since only the whole match is ever used. Prefixes are ordered by how many families they have.
+cazy_fam_regex = re.compile(r"(?:GH|GT|CBM|PL|CE|AA)\d+(?:_\d+)?")
+_fullmatch_cazy_family = cazy_fam_regex.fullmatch
+_match_cazy_family = cazy_fam_regex.match
 
-    def __init__(self):
-        pass
 
-    def valid_cazy_family(self, family_string_to_test):
-        if family_string_to_test in _DELETEDFAMILYLIST:
-            return False
-        return bool(self.cazy_fam_regex.fullmatch(family_string_to_test))
+def valid_cazy_family(family_string_to_test):
+    if family_string_to_test in _DELETED_FAMILIES:
+        return False
+    return bool(_fullmatch_cazy_family(family_string_to_test))
 
-    def extract_cazy_family(self, string_to_extract_from):
-        result = self.cazy_fam_regex.match(string_to_extract_from)
-        if result:
-            return result.group()
-        else:
-            return ""
+
+def extract_cazy_family(string_to_extract_from):
+    result = _match_cazy_family(string_to_extract_from)
+    if result:
+        return result.group()
+    else:
+        return ""
+
+
+class Matcher:
+    # kept so existing callers can keep using Matcher().valid_cazy_family(), the module functions above can be called
+    # directly instead
+    cazy_fam_regex = cazy_fam_regex
+    valid_cazy_family = staticmethod(valid_cazy_family)
+    extract_cazy_family = staticmethod(extract_cazy_family)
 
 
 def check_deleted_families(family):
-    if family in _DELETEDFAMILYLIST:
+    if family in _DELETED_FAMILIES:
         raise PipelineException(f"Family {family} is a deleted family. "
                                 f"Check https://www.cazypedia.org/index.php/{family} for more details")
 
 
+# In-memory copies of the family categories, so the default lists are only built once and the user category file is
+# only parsed again when it changes. write_family_files() and cli_append_user_family() reset the user cache.
+_default_categories_cache = None
+_user_categories_cache = None
+# (st_mtime_ns, st_size) of the user category file when it was cached, so edits made outside this process are also
+# picked up. The size catches rewrites that land within the timestamp resolution of the filesystem.
+_user_categories_stamp = None
+
+
+def _copy_categories(categories):
+    # copy the family lists too, callers are free to modify the returned categories before saving them
+    return {category: list(families) for category, families in categories.items()}
+
+
 def get_default_family_categories():
+    global _default_categories_cache
+    if _default_categories_cache is None:
+        _default_categories_cache = _build_default_family_categories()
+    return _copy_categories(_default_categories_cache)
 
-    fam_lists = {"all_families": []}
-    families = [("GH", 173), ("GT", 115), ("PL", 20), ("CE", 20), ("AA", 17), ("CBM", 91)]
 
-    for fam_tuple in families:
-        for num in range(1, fam_tuple[1]+1):
-            if f"{fam_tuple[0]}{num}" not in _DELETEDFAMILYLIST:
-                fam_lists["all_families"].append(f"{fam_tuple[0]}{num}")
+def _build_default_family_categories():
+
+    families = [("GH", 173), ("GT", 115), ("PL", 20), ("CE", 20), ("AA", 17), ("CBM", 91)]
+    all_families = [f"{prefix}{num}" for prefix, count in families for num in range(1, count+1)]
+    fam_lists = {"all_families": [family for family in all_families if family not in _DELETED_FAMILIES]}
 
     fam_lists["plant_cell_wall"] = ["GH5", "GH6", "GH7", "GH8", "GH9", "GH10", "GH11", "GH12", "GH26", "GH28", "GH44",
                                     "GH45", "GH48", "GH53", "GH88", "GH95", "GH16", "GH17", "GH74", "GH81", "GH23",
@@ -100,9 +143,29 @@ def get_default_family_categories():
     return fam_lists
 
 
+def _categories_file_stamp():
+    try:
+        stat_result = os.stat(_default_fam_lists_file_path())
+        return stat_result.st_mtime_ns, stat_result.st_size
+    except FileNotFoundError:
+        return None
+
+
 def get_user_categories():
-    #   Check for category file and create if necessary
-    if not os.path.isfile(default_fam_lists_file_path):
+    global _user_categories_cache, _user_categories_stamp
+    categories_stamp = _categories_file_stamp()
+    if _user_categories_cache is None or categories_stamp != _user_categories_stamp:
+        _user_categories_cache = _read_user_categories()
+        _user_categories_stamp = categories_stamp
+    return _copy_categories(_user_categories_cache)
+
+
+def _read_user_categories():
+    # load existing JSON which we will get list from
+    try:
+        with open(_default_fam_lists_file_path(), 'rb') as jsonfile:
+            fam_cats = json.load(jsonfile)
+    except FileNotFoundError:
         #     todo: might want to uncomment this after setting the write_family_files()
         #      function to be skipped during a test in the bioconda test harness
         # print("Default family category config file not found, creating it...")
@@ -115,11 +178,6 @@ def get_user_categories():
         #     sys.exit(1)
         print("Default family category config file not found, using default...")
         return get_default_family_categories()
-
-    # load existing JSON which we will get list from
-    try:
-        with open(default_fam_lists_file_path, 'r', encoding="utf-8") as jsonfile:
-            fam_cats = json.loads(jsonfile.read())
     except IOError as error:
         print("ERROR:", error.args[0])
         print("ERROR: Cannot load data from family_categories config file.\n"
@@ -143,9 +201,8 @@ def get_category_list(category_name):
             raise UserError(f"Family category argument \"{category_name}\" is not found in family_categories.json\n"
                             f"You can add or modify custom family categories using the saccharis.add_family_category "
                             "command.")
-    matcher = Matcher()
     for fam in cat_list:
-        if not matcher.valid_cazy_family(fam):
+        if not valid_cazy_family(fam):
             raise UserError(f"ERROR: Invalid family argument read from family category: \"{fam}\"\n"
                             f"\tPlease edit the category to either delete or edit this into a valid family: PL*, GH*, "
                             f"GT*, CE*, or AA*, where * is a number.")
@@ -154,17 +211,17 @@ def get_category_list(category_name):
 
 
 def load_family_list_from_file(file):
-    if type(file) == str:
-        family_file = open(file, 'r')
-    elif type(file) == io.TextIOWrapper:
+    if isinstance(file, (str, os.PathLike)):
+        family_file = open(file, 'r', encoding="utf-8")
+    elif isinstance(file, io.IOBase):
         family_file = file
     else:
         print(type(file))
         raise UserError(f"Bad variable type '{type(file)}' passed to load_family_list_from_file")
 
     try:
-        fam_list = json.loads(family_file.read())
-        if type(fam_list) == dict:
+        fam_list = json.load(family_file)
+        if isinstance(fam_list, dict):
             fam_list = list(fam_list.keys())
     except JSONDecodeError as error:
         print("ERROR:", error.args[0])
@@ -182,9 +239,8 @@ def load_family_list_from_file(file):
     finally:
         family_file.close()
 
-    matcher = Matcher()
     for fam in fam_list:
-        if not matcher.valid_cazy_family(fam):
+        if not valid_cazy_family(fam):
             raise UserError(f"ERROR: Invalid family argument read from file: \"{fam}\"\n"
                             f"\tPlease input a valid family: PL*, GH*, GT*, CE*, or "
                             f"AA*, where * is a number.")
@@ -194,8 +250,8 @@ def load_family_list_from_file(file):
 
 def save_family_iterable_json(family_iterable, out_path):
     out_dir = os.path.dirname(out_path)
-    if not os.path.exists(out_dir):
-        os.mkdir(out_dir)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
 
     # found_file = os.path.join(out_dir, re.sub(r"\.fa.*", "_families.json", os.path.basename(input_fasta)))
     with open(out_path, 'w', encoding="utf-8") as jsonfile:
@@ -208,11 +264,10 @@ def write_family_files(out_folder=None, data=None):
     #      updates?
     #
     if out_folder is None:
-        out_folder = folder_config
+        out_folder = get_config_folder()
         print(f"Writing {'default ' if data is None else ''}family files to default folder location...")
 
-    if not os.path.exists(out_folder):
-        os.mkdir(out_folder)
+    os.makedirs(out_folder, exist_ok=True)
 
     all_families_file_path = os.path.join(out_folder, all_families_filename)
     fam_lists_file_path = os.path.join(out_folder, fam_lists_filename)
@@ -226,6 +281,8 @@ def write_family_files(out_folder=None, data=None):
     print(f"Writing all CAZyme family list to file: {all_families_file_path}")
     with open(all_families_file_path, 'w', encoding="utf-8") as file:
         json.dump(data["all_families"], file, ensure_ascii=False, indent=4)
+    global _user_categories_cache
+    _user_categories_cache = None
 
 
 def show_categories(category_name: str = None):
@@ -272,14 +329,17 @@ def cli_append_user_family():
 
     families = args.families
     category_name = args.category_name
-    m = Matcher()
     for family in families:
-        if not m.valid_cazy_family(family):
+        if not valid_cazy_family(family):
             print(f"ERROR: Invalid CAZyme family: {family}")
             print("Exiting...")
             sys.exit(3)
 
-    if not os.path.isfile(default_fam_lists_file_path):
+    # load existing JSON which we will append or replace category of
+    try:
+        with open(_default_fam_lists_file_path(), 'r', encoding="utf-8") as jsonfile:
+            categories: list[str] = json.load(jsonfile)
+    except FileNotFoundError:
         print("Family category config file not found, creating it...")
         try:
             write_family_files()
@@ -288,11 +348,8 @@ def cli_append_user_family():
             print("ERROR: Cannot create default family_categories config file.\n"
                   "Check that you have proper filesystem permissions.")
             sys.exit(1)
-
-    # load existing JSON which we will append or replace category of
-    try:
-        with open(default_fam_lists_file_path, 'r', encoding="utf-8") as jsonfile:
-            categories: list[str] = json.loads(jsonfile.read())
+        # the file was just written with the default categories
+        categories = get_default_family_categories()
     except IOError as error:
         print("ERROR:", error.args[0])
         print("ERROR: Cannot load data from default family_category config file.")
@@ -324,8 +381,10 @@ def cli_append_user_family():
         elif mode == WriteMode.REMOVE:
             categories[category_name] = list(filter(lambda item: item not in families, categories[category_name]))
         try:
-            with open(default_fam_lists_file_path, 'w', encoding="utf-8") as jsonfile:
+            with open(_default_fam_lists_file_path(), 'w', encoding="utf-8") as jsonfile:
                 json.dump(categories, jsonfile, ensure_ascii=False, indent=4)
+            global _user_categories_cache
+            _user_categories_cache = None
             print(f"New category \"{category_name}\" added to category list.")
             show_categories(category_name)
         except IOError as error:
@@ -10,47 +10,74 @@ from Bio.SeqRecord import SeqRecord
 from saccharis.utils.Formatting import CazymeMetadataRecord
 from saccharis.utils.PipelineErrors import UserError
 
+# organism name in NCBI style fasta descriptions, e.g. "murein transglycosylase [Neisseria gonorrhoeae FA 1090]".
+# Returns the first bracketed name, which may contain one level of brackets, e.g. "[[Clostridium] cellulolyticum H10]".
+# The character classes can't backtrack, so descriptions with many unmatched brackets are still matched in linear time.
+_SPECIES_RE = re.compile(r'\[((?:[^\[\]]|\[[^\[\]]*\])+)\]')
+
+
+def _parse_fasta_file(path: str | os.PathLike | TextIOBase, logger: Logger = None) -> list[SeqRecord]:
+    try:
+        return list(parse(path, 'fasta'))
+    except FileNotFoundError as err:
+        raise UserWarning(f"ERROR: File path \"{err.filename}\" for provided user sequences is invalid! Did you "
+                          f"type it correctly?") from err
+    except Exception as err:
+        try:
+            return list(parse(path, 'fasta-2line'))
+        except Exception as other:
+            logger.error("Exception 1:", err.args[0])
+            logger.error("Exception 2:", other.args[0])
+            raise UserWarning("WARNING: Unknown error occurred while parsing user sequences. User sequences not "
+                              "included in analysis!\nPlease check that the file format is valid.") from other
+
+
+def _make_metadata_record(record: SeqRecord, source) -> CazymeMetadataRecord:
+    species_match = _SPECIES_RE.search(record.description)
+    return CazymeMetadataRecord(source_file=source,
+                                protein_id=record.id,
+                                protein_name=record.description,
+                                org_name=species_match.group(1) if species_match else None)
+
+
+def _duplicate_id_error(record_id: str) -> UserError:
+    return UserError(f"Multiple input files contain record id: '{record_id}'. Please rename record ids in FASTA "
+                     f"headers for uniqueness.")
+
 
 def parse_multiple_fasta(fasta_handles: list[str | os.PathLike | TextIOBase], output_folder: str | os.PathLike = None,
                          logger: Logger = None, source_override: str = None) \
         -> (list[SeqRecord], dict[str:CazymeMetadataRecord], str):
 
-    metadata_dict: dict[str:CazymeMetadataRecord] = {}
-    all_seqs: list[SeqRecord] = []
-
-    for path in fasta_handles:
-        try:
-            seqs = list(parse(path, 'fasta'))
-        except FileNotFoundError as err:
-            raise UserWarning(f"ERROR: File path \"{err.filename}\" for provided user sequences is invalid! Did you "
-                              f"type it correctly?") from err
-        except Exception as err:
-            try:
-                seqs = list(parse(path, 'fasta-2line'))
-            except Exception as other:
-                logger.error("Exception 1:", err.args[0])
-                logger.error("Exception 2:", other.args[0])
-                raise UserWarning("WARNING: Unknown error occurred while parsing user sequences. User sequences not "
-                                  "included in analysis!\nPlease check that the file format is valid.") from other
-
-        for record in seqs:
-            if record.id in metadata_dict:
-                raise UserError(f"Multiple input files contain record id: '{record.id}'. Please rename record ids in "
-                                f"FASTA headers for uniqueness.")
-            if len(fasta_handles) > 1 and not source_override:
-                record.description += f" SACCHARIS merged record from {path}"
-            species_match = re.search(r'\[(.+)\]', record.description)
-            new_record = CazymeMetadataRecord(source_file=source_override if source_override else path,
-                                              protein_id=record.id,
-                                              protein_name=record.description,
-                                              org_name=species_match.group(1) if species_match else None)
-            metadata_dict[record.id] = new_record
-            all_seqs.append(record)
+    if len(fasta_handles) == 1:
+        # a single file has nothing to merge, so records don't need a merge note and ids are only checked for
+        # duplicates once all the metadata has been built
+        path = fasta_handles[0]
+        all_seqs = _parse_fasta_file(path, logger)
+        source = source_override if source_override else path
+        metadata_dict = {record.id: _make_metadata_record(record, source) for record in all_seqs}
+        if len(metadata_dict) != len(all_seqs):
+            seen_ids = set()
+            for record in all_seqs:
+                if record.id in seen_ids:
+                    raise _duplicate_id_error(record.id)
+                seen_ids.add(record.id)
+    else:
+        metadata_dict: dict[str:CazymeMetadataRecord] = {}
+        all_seqs: list[SeqRecord] = []
+        for path in fasta_handles:
+            source = source_override if source_override else path
+            for record in _parse_fasta_file(path, logger):
+                if record.id in metadata_dict:
+                    raise _duplicate_id_error(record.id)
+                if not source_override:
+                    record.description += f" SACCHARIS merged record from {path}"
+                metadata_dict[record.id] = _make_metadata_record(record, source)
+                all_seqs.append(record)
 
     out_path = None
     if output_folder:
-        if not os.path.exists(output_folder):
-            os.mkdir(output_folder)
+        os.makedirs(output_folder, exist_ok=True)
         filename = f"merged_user_fasta-{datetime.datetime.now().strftime('%d-%m-%y_%H-%M')}.fasta"
         out_path = os.path.join(output_folder, filename)
         write(all_seqs, out_path, 'fasta')
@@ -4,11 +4,9 @@
 # SACCHARIS 2.0 author: Alexander Fraser, https://github.com/AlexSCFraser
 # License: GPL v3
 ###############################################################################
-import math
 import subprocess
 from copy import deepcopy
 from dataclasses import dataclass
-from functools import reduce
 from logging import Logger, getLogger
 from typing import Optional, Tuple
 
@@ -18,7 +16,7 @@ from saccharis.utils.PipelineErrors import PipelineException
 
 
 def convert_path_wsl(path: str):
-    if not path.__contains__(' '):
+    if ' ' not in path:
         # this line feels unnecessary, but for some reason this function breaks on windows paths without spaces when
         # single quoted, and ALSO breaks on windows paths WITH spaces when single quoted, so we only single quote on
         # paths without spaces. Very weird behaviour. Double quotes don't work at all, they remove all the slahes.
@@ -51,9 +49,13 @@ class CazymeMetadataRecord:
 def rename_header_ids(new_user_fasta_file: str, metadata_dict: dict[str, CazymeMetadataRecord]) \
                                                                                     -> dict[str, CazymeMetadataRecord]:
     new_metadata_dict: dict[str, CazymeMetadataRecord] = {}
+    rename_dict = {}
     with open(new_user_fasta_file, 'r') as new_user_file:
-        headers = filter(lambda line: line.__contains__('>'), new_user_file.readlines())
-        rename_dict = {line.split(' ')[1]: line.split(' ')[0][1:] for line in headers}
+        # only header lines are split, sequence lines are skipped without being scanned or kept in memory
+        for line in new_user_file:
+            if line.startswith('>'):
+                new_id, old_id = line.split(' ', 2)[:2]
+                rename_dict[old_id] = new_id[1:]
     for record_id in metadata_dict:
         new_metadata_dict[rename_dict[record_id]] = metadata_dict[record_id]
 
@@ -69,20 +71,14 @@ def make_metadata_dict(metadata_dict: dict[str, CazymeMetadataRecord],
     new_cazyme_dict = {}
     new_module_list = metadata_dict.keys()
     for module in module_list:
-        if module.__contains__("<"):
-            module_id = module.split("<")[0]
-        else:
-            module_id = module
+        module_id, sep, _ = module.partition("<")
+        if not sep:
             # if merged_dict and module_id not in merged_dict and module_id not in cazy_accession_dict:
             if module_id not in metadata_dict:
                 logger.error(f"Bad loading of data from merged fasta dictionary. {module_id} not in merged_dict")
 
-        ecami_prediction = ecami_dict[module] if module in ecami_dict else \
-                           ecami_dict[module_id] if module_id in ecami_dict else \
-                           None
-        diamond_prediction = diamond_dict[module] if module in diamond_dict else \
-                             diamond_dict[module_id] if module_id in diamond_dict else \
-                             None
+        ecami_prediction = ecami_dict.get(module, ecami_dict.get(module_id))
+        diamond_prediction = diamond_dict.get(module, diamond_dict.get(module_id))
 
         # todo: delete below once new behaviour is confirmed to work correctly
         # if merged_dict and module in merged_dict:
@@ -140,8 +136,9 @@ def make_metadata_dict(metadata_dict: dict[str, CazymeMetadataRecord],
         try:
             entry_item.ecami_prediction = ecami_prediction
             entry_item.diamond_prediction = diamond_prediction
-            entry_item.module_start = bounds_dict[module][0]
-            entry_item.module_end = bounds_dict[module][1]
+            bounds = bounds_dict[module]
+            entry_item.module_start = bounds[0]
+            entry_item.module_end = bounds[1]
         except TypeError as err:
             msg = "Type error on updating CazymeMetadataRecord objects. \n" \
                   "PLEASE REPORT THIS ERROR TO THE DEVELOPER THROUGH GITHUB OR EMAIL, AS ITS INTERMITTENT AND " \
@@ -164,14 +161,16 @@ def make_metadata_dict(metadata_dict: dict[str, CazymeMetadataRecord],
 
 
 def format_time(seconds):
+    minutes, remainder = divmod(seconds, 60)
     if seconds > 3600:
-        return f"*\t {math.floor(seconds/3600):.0f} hours, {math.floor(seconds%3600/60):.0f} minutes, " \
-               f"{seconds % 60:.0f} seconds to run"
+        hours, minutes = divmod(minutes, 60)
+        return f"*\t {hours:.0f} hours, {minutes:.0f} minutes, {remainder:.0f} seconds to run"
     if seconds > 60:
-        return f"*\t {math.floor(seconds/60):.0f} minutes, {seconds%60:.0f} seconds to run"
+        return f"*\t {minutes:.0f} minutes, {remainder:.0f} seconds to run"
 
     return f"*\t {seconds:.1f} seconds to run"
 
 
 def seqs_to_string(seqs: list[SeqRecord]):
-    return reduce(lambda a, b: a.format("fasta") + b.format("fasta"), seqs)
+    # each record is formatted once and joined in a single pass, instead of re-copying the accumulated string per record
+    return "".join(seq.format("fasta") for seq in seqs)
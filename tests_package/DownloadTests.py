@@ -1,15 +1,22 @@
+import hashlib
+import http.server
 import os
 import shutil
+import subprocess
 import sys
+import threading
 import unittest
 from inspect import getsourcefile
 from unittest import mock
 
 
-from saccharis.utils.DatabaseDownload import download_database, cli_update_hmms
+from saccharis.utils import DatabaseDownload
+from saccharis.utils.DatabaseDownload import download_database, cli_update_hmms, download_and_process, \
+    get_output_paths, is_processed
 
 tests_folder = os.path.dirname(getsourcefile(lambda: 0))
 test_out_folder = os.path.join(tests_folder, "test_files", "temp")
+protocol_out_folder = os.path.join(tests_folder, "test_files", "temp_download_protocol")
 
 
 def get_hmm_suffices(filename: str):
@@ -50,3 +57,160 @@ class DownloadTestCase(unittest.TestCase):
         with mock.patch.object(sys, 'argv', testargs):
             with self.assertRaises(SystemExit):
                 cli_update_hmms()
+
+
+class _DatabaseRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves a single database file with an ETag, supporting conditional and byte range requests like the dbCAN
+    server. Settings and the headers of each request are kept on the class, and reset by each test."""
+    data = bytes(range(256)) * 4000
+    etag = '"db-v1"'
+    # answer If-None-Match with 304, some servers ignore it and send the whole file every time
+    honour_conditional = True
+    # number of bytes sent before dropping the connection on the next response, None to send the whole response
+    drop_after = None
+    requests = []
+
+    def do_GET(self):
+        type(self).requests.append(dict(self.headers))
+        if self.honour_conditional and self.headers.get("If-None-Match") == self.etag:
+            self.send_response(304)
+            self.send_header("ETag", self.etag)
+            self.end_headers()
+            return
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range") == self.etag:
+            start = int(range_header.removeprefix("bytes=").rstrip("-"))
+            body = self.data[start:]
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(self.data) - 1}/{len(self.data)}")
+        else:
+            body = self.data
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        if self.drop_after is not None:
+            self.wfile.write(body[:self.drop_after])
+            type(self).drop_after = None
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class DownloadProtocolTestCase(unittest.TestCase):
+    """Tests download_and_process against a local server, so no files are downloaded from dbCAN."""
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.server = http.server.ThreadingHTTPServer(("localhost", 0), _DatabaseRequestHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.url = f"http://localhost:{cls.server.server_port}/CAZyDB.fa"
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self) -> None:
+        os.makedirs(protocol_out_folder, exist_ok=True)
+        _DatabaseRequestHandler.honour_conditional = True
+        _DatabaseRequestHandler.drop_after = None
+        _DatabaseRequestHandler.requests = []
+        # retries back off for DELAY seconds, which would make the dropped connection tests slow
+        delay_patch = mock.patch.object(DatabaseDownload, "DELAY", 0)
+        delay_patch.start()
+        self.addCleanup(delay_patch.stop)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(protocol_out_folder)
+
+    def test_not_modified_keeps_file(self) -> None:
+        self.assertTrue(download_and_process(self.url, protocol_out_folder))
+        output_path = os.path.join(protocol_out_folder, "CAZyDB.fa")
+        first_mtime = os.stat(output_path).st_mtime_ns
+
+        # a forced update asks the server whether the file changed, and keeps the existing file on a 304
+        self.assertFalse(download_and_process(self.url, protocol_out_folder, force_download=True))
+        self.assertEqual(_DatabaseRequestHandler.etag, _DatabaseRequestHandler.requests[-1].get("If-None-Match"))
+        self.assertEqual(first_mtime, os.stat(output_path).st_mtime_ns)
+        with open(output_path, 'rb') as downloaded_file:
+            self.assertEqual(_DatabaseRequestHandler.data, downloaded_file.read())
+
+    def test_matching_etag_keeps_file(self) -> None:
+        self.assertTrue(download_and_process(self.url, protocol_out_folder))
+        output_path = os.path.join(protocol_out_folder, "CAZyDB.fa")
+        first_mtime = os.stat(output_path).st_mtime_ns
+
+        # the server ignores If-None-Match and sends the whole file, but its ETag shows the file hasn't changed
+        _DatabaseRequestHandler.honour_conditional = False
+        self.assertFalse(download_and_process(self.url, protocol_out_folder, force_download=True))
+        self.assertEqual(first_mtime, os.stat(output_path).st_mtime_ns)
+        self.assertFalse(os.path.exists(f"{output_path}.part"))
+
+    def test_dropped_connection_resumes(self) -> None:
+        data = _DatabaseRequestHandler.data
+        _DatabaseRequestHandler.drop_after = 300000
+        self.assertTrue(download_and_process(self.url, protocol_out_folder))
+
+        # the second request only asks for the part of the file that wasn't received the first time
+        self.assertEqual(2, len(_DatabaseRequestHandler.requests))
+        resume_request = _DatabaseRequestHandler.requests[1]
+        self.assertTrue(resume_request.get("Range", "").startswith("bytes="))
+        self.assertNotEqual("bytes=0-", resume_request.get("Range"))
+        self.assertEqual(_DatabaseRequestHandler.etag, resume_request.get("If-Range"))
+
+        output_path = os.path.join(protocol_out_folder, "CAZyDB.fa")
+        with open(output_path, 'rb') as downloaded_file:
+            self.assertEqual(data, downloaded_file.read())
+        self.assertFalse(os.path.exists(f"{output_path}.part"))
+        metadata = DatabaseDownload.load_download_metadata(protocol_out_folder)[self.url]
+        self.assertEqual(hashlib.sha256(data).hexdigest(), metadata["sha256"])
+        self.assertEqual(str(len(data)), metadata["content_length"])
+
+    def test_unchanged_download_skips_process(self) -> None:
+        hmmpress_calls = []
+
+        def fake_hmmpress(args, **kwargs):
+            hmmpress_calls.append(args)
+            for output_path in get_hmm_suffices(args[-1]):
+                with open(output_path, 'wb'):
+                    pass
+
+        with mock.patch.object(DatabaseDownload.subprocess, "run", fake_hmmpress):
+            self.assertTrue(download_and_process(self.url, protocol_out_folder, "hmmpress"))
+            # the server now reports a new version, but the file it sends has the same contents
+            with mock.patch.object(_DatabaseRequestHandler, "etag", '"db-v2"'):
+                self.assertTrue(download_and_process(self.url, protocol_out_folder, "hmmpress", force_download=True))
+        self.assertEqual(1, len(hmmpress_calls))
+        self.assertTrue(is_processed(*get_output_paths(self.url, protocol_out_folder, "hmmpress")[1:]))
+
+    def test_failed_process_not_processed(self) -> None:
+        def crashing_diamond(args, **kwargs):
+            # diamond writes part of the database before failing
+            with open(f"{args[-1]}.dmnd", 'wb') as dmnd_file:
+                dmnd_file.write(b"partial")
+            raise subprocess.CalledProcessError(1, args)
+
+        def working_diamond(args, **kwargs):
+            with open(f"{args[-1]}.dmnd", 'wb') as dmnd_file:
+                dmnd_file.write(b"complete")
+
+        _, processed_filepaths, completion_marker = get_output_paths(self.url, protocol_out_folder, "diamond",
+                                                                     "CAZy.fa")
+        with mock.patch.object(DatabaseDownload.subprocess, "run", crashing_diamond):
+            with self.assertRaises(subprocess.CalledProcessError):
+                download_and_process(self.url, protocol_out_folder, "diamond", "CAZy.fa")
+        self.assertFalse(is_processed(processed_filepaths, completion_marker))
+        self.assertFalse(os.path.exists(completion_marker))
+
+        # the next update downloads the file again and reruns diamond instead of keeping the partial database
+        with mock.patch.object(DatabaseDownload.subprocess, "run", working_diamond):
+            self.assertTrue(download_and_process(self.url, protocol_out_folder, "diamond", "CAZy.fa"))
+        self.assertEqual(2, len(_DatabaseRequestHandler.requests))
+        self.assertTrue(is_processed(processed_filepaths, completion_marker))
+        with open(processed_filepaths[0], 'rb') as dmnd_file:
+            self.assertEqual(b"complete", dmnd_file.read())
+        self.assertFalse(os.path.exists(os.path.join(protocol_out_folder, "CAZy.fa")))
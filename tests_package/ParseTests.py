@@ -28,6 +28,11 @@ class ParseTestCase(unittest.TestCase):
         fasta_string = seqs_to_string(seqs)
         self.assertEqual(fasta_string, FastaData.GH102)
 
+    def test_single_record_to_string(self):
+        seqs, sources, path = parse_multiple_fasta([GH102_file])
+        fasta_string = seqs_to_string(seqs[:1])
+        self.assertEqual(fasta_string, FastaData.GH102[:FastaData.GH102.index(">", 1)])
+
     def test_load_multiple(self):
         fasta_files = [GH102_file, GH102_UserFormat_file]
         seqs, sources, path = parse_multiple_fasta(fasta_files)
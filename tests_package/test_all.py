@@ -4,7 +4,7 @@ from tests_package.HelperTests import HelperTestCase
 from tests_package.PruneTests import PruneTestCase
 from tests_package.UserFastaRenameTest import UserRenameFastaTestCase
 from tests_package.UserInputTesting import UserInputTestCase
-from tests_package.DownloadTests import DownloadTestCase
+from tests_package.DownloadTests import DownloadTestCase, DownloadProtocolTestCase
 from tests_package.NCBITests import NCBITestCase
 from tests_package.IntegrationTests import IntegrationTestCase
 from tests_package.AAModelTests import AAModelTestCase
@@ -20,6 +20,7 @@ def saccharis_test_suite():
     suite.addTest(loader.loadTestsFromTestCase(CazyTestCase))
     suite.addTest(loader.loadTestsFromTestCase(NCBITestCase))
     suite.addTest(loader.loadTestsFromTestCase(DownloadTestCase))
+    suite.addTest(loader.loadTestsFromTestCase(DownloadProtocolTestCase))
     suite.addTest(loader.loadTestsFromTestCase(PruneTestCase))
     suite.addTest(loader.loadTestsFromTestCase(UserRenameFastaTestCase))
     suite.addTest(loader.loadTestsFromTestCase(UserInputTestCase))